@@ -1,63 +1,141 @@
-def count_locs(
-        target_file: str, 
-        comment_signs: list[str] | None, 
-        multi_line_comment_signs: dict | None
-    ) -> tuple[int, int] | None:
+import os
+from functools import lru_cache
+from itertools import filterfalse
+from operator import methodcaller
+from typing import Callable
+
+
+_WINDOW_SIZE = 1 << 20       # Bytes classified at once in big files
+
+def read_file_bytes(target_file: str) -> bytes:
+    # Plain open/fstat/read syscalls with a right-sized buffer, skipping the buffered IO layer of open()
+    fd = os.open(target_file, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
     try:
-        with open(target_file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-    except Exception as e:
-        print(f"[PYLOC] Error reading {target_file}: {e}")
-        return None
-    
-    code_lines_count = 0
+        size = os.fstat(fd).st_size
+        if not size:
+            return b''          # Empty files (like __init__.py stubs) need no read syscall
+        data = os.read(fd, size)
+        while len(data) < size:         # Short reads only happen on very large files
+            chunk = os.read(fd, size - len(data))
+            if not chunk:
+                break
+            data += chunk
+    finally:
+        os.close(fd)
+    return data
 
-    # Handle multi-line comment blocks
-    multi_line_comment_ranges = []      # Will contain tuples (start, end) of all the multi comment blocks
-    if multi_line_comment_signs:
-        start_mark = multi_line_comment_signs.get('start', '')      # Like '/*' for cpp, '<!--' for HTML
-        end_mark = multi_line_comment_signs.get('end', '')          # Like '*/' for cpp, '-->' for HTML
-
-        if start_mark and end_mark:
-            inside_comment_block = False
-            start_block_idx = None
-
-            for i, line in enumerate(lines):            # Scan lines of the target file
-                if not inside_comment_block and start_mark in line:      # Found a comment block start mark
-                    inside_comment_block = True
-                    start_block_idx = i         # Save idx of line
-                elif inside_comment_block and end_mark in line:  # Found a comment block end mark
-                    multi_line_comment_ranges.append((start_block_idx, i))   # Save end of comment block
-                    inside_comment_block = False
-                    start_block_idx = None
-
-    # Normalize single line comment marks
+def _strip_comment_blocks(
+        data: bytes, 
+        comment_signs: tuple[bytes, ...], 
+        start_mark: bytes, 
+        end_mark: bytes
+    ) -> bytes:
+    # Strip multi-line comment blocks in a single forward scan, jumping from one mark to the next.
+    # Each block is replaced by the newlines it spans, so that lines keep their position and
+    # only the code around a block (like in 'x = 1; /* comment */') survives on its lines
+    code_chunks = []
+    copied_pos = 0          # Start of the code not yet copied into code_chunks
+    search_pos = 0
+
+    while True:
+        start_pos = data.find(start_mark, search_pos)       # CODE state: look for a comment block start mark
+        if start_pos == -1:
+            break
+
+        # Only look back as far as the last copied byte, so that long lines with many blocks stay linear
+        line_prefix = data[max(data.rfind(b'\n', copied_pos, start_pos) + 1, copied_pos):start_pos]
+        if any(sign in line_prefix for sign in comment_signs):     # Start mark is inside a single line comment
+            search_pos = data.find(b'\n', start_pos)
+            if search_pos == -1:
+                break
+            continue
+
+        end_pos = data.find(end_mark, start_pos + len(start_mark))    # BLOCK state: look for its end mark
+        if end_pos == -1:
+            break               # Unterminated comment block, left as code
+        end_pos += len(end_mark)
+
+        code_chunks.append(data[copied_pos:start_pos])
+        code_chunks.append(b'\n' * data.count(b'\n', start_pos, end_pos))
+        copied_pos = search_pos = end_pos
+
+    if not code_chunks:
+        return data
+    code_chunks.append(data[copied_pos:])
+    return b''.join(code_chunks)
+
+@lru_cache(maxsize=None)
+def _make_counter(
+        comment_signs: tuple[str, ...], 
+        start_mark: str, 
+        end_mark: str
+    ) -> Callable[[bytes], int]:
+    # Build a counter specialized for one set of comment marks, shared by all the files using them:
+    # marks are encoded once, and the stages a language does not need are left out entirely
+    comment_signs = tuple(sign.encode() for sign in comment_signs)
+    start_mark = start_mark.encode()
+    end_mark = end_mark.encode()
+    is_full_line_comment = methodcaller('startswith', comment_signs)
+
+    def count_window_code_lines(window: bytes) -> int:
+        # Classify lines through C-level builtins instead of a per-line Python loop
+        # Only leading whitespace matters for both the blank and the startswith checks, so lstrip is enough
+        code_lines = filter(None, map(bytes.lstrip, window.split(b'\n')))      # Skipping blank lines
+        if comment_signs:
+            code_lines = filterfalse(is_full_line_comment, code_lines)     # Skipping full line comments
+        return len(list(code_lines))
+
+    def count_code_lines(data: bytes) -> int:
+        if len(data) <= _WINDOW_SIZE:
+            return count_window_code_lines(data)
+
+        # Big files are classified one newline-aligned window at a time, so that the per-line objects
+        # built by split() never take more than a window worth of memory
+        code_lines_count = 0
+        window_start = 0
+        while window_start < len(data):
+            window_end = data.find(b'\n', window_start + _WINDOW_SIZE)
+            if window_end == -1:
+                window_end = len(data)
+            code_lines_count += count_window_code_lines(data[window_start:window_end])
+            window_start = window_end + 1
+        return code_lines_count
+
+    if not (start_mark and end_mark):
+        return count_code_lines
+
+    def count_code_lines_with_blocks(data: bytes) -> int:
+        return count_code_lines(_strip_comment_blocks(data, comment_signs, start_mark, end_mark))
+
+    return count_code_lines_with_blocks
+
+def make_loc_counter(
+        comment_signs: list[str] | str | None, 
+        multi_line_comment_signs: dict | None
+    ) -> Callable[[bytes], int]:
+    # Normalize comment marks
     if isinstance(comment_signs, str):
         comment_signs = [comment_signs]
     elif comment_signs is None:
         comment_signs = []
 
-    # Process each line
-    for idx, line in enumerate(lines):
-        stripped = line.strip()
-        if not stripped:
-            continue            # Skipping blank lines
+    start_mark, end_mark = '', ''
+    if multi_line_comment_signs:
+        start_mark = multi_line_comment_signs.get('start') or ''     # Like '/*' for cpp, '<!--' for HTML
+        end_mark = multi_line_comment_signs.get('end') or ''         # Like '*/' for cpp, '-->' for HTML
 
-        # Check if line is inside a multi-line comment block
-        if any(start <= idx <= end for start, end in multi_line_comment_ranges):
-            continue
-        
-        # Check if line is a full line comment
-        if any(stripped.startswith(sign) for sign in comment_signs):
-            continue
+    return _make_counter(tuple(comment_signs), start_mark, end_mark)
 
-        # Check for inline comment
-        has_inline_comment = any(sign in stripped for sign in comment_signs)
-        if has_inline_comment:
-            code_lines_count += 1
-            continue
+def count_locs(
+        target_file: str, 
+        loc_counter: Callable[[bytes], int]
+    ) -> tuple[int | None, str | None]:
+    # Errors are returned instead of printed, so that workers never print while files are being counted
+    try:
+        data = read_file_bytes(target_file)
+    except Exception as e:
+        return None, f"[PYLOC] Error reading {target_file}: {e}"
 
-        # Fallback: pure code line
-        code_lines_count += 1
-        
-    return code_lines_count
+    if not data:
+        return 0, None
+    return loc_counter(data), None
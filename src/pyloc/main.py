@@ -1,9 +1,15 @@
 import argparse
 import time
 import os
-import glob
 import json
+import re
+import string
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+from typing import Callable
 
 from .loc_counting.loc_counting import *
 
@@ -17,19 +23,154 @@ def setup_parser() -> argparse.ArgumentParser:
     parser.add_argument('-i', '--insights', default=False, action='store_true', help='Show insights. Only available if the -e flag is used')
     return parser
 
-def get_files_list(dir_path: str) -> set[str]:
+def get_files_list(
+        dir_path: str, 
+        is_ignored: Callable[[str], bool] | None = None, 
+        extensions: set[str] | None = None
+    ) -> dict[str, str]:
+    # Walk, extension filtering and .gitignore exclusion are done in a single pass.
+    # Returns the surviving relative paths, each mapped to its extension (like '.py')
     base = os.fspath(dir_path)
-    result = set()
-    for root, _, files in os.walk(base):
-        for f in files:
-            full = os.path.join(root, f)
-            rel = os.path.relpath(full, base)
-            result.add(rel)
+    result = {}
+    stack = [(base, '')]        # Directories still to scan, with their path relative to base
+    while stack:
+        dir_abs, dir_rel = stack.pop()
+        try:
+            with os.scandir(dir_abs) as entries:
+                entries = list(entries)
+        except OSError:
+            continue            # Unreadable directories are skipped, like os.walk does
+        for entry in entries:
+            rel = dir_rel + entry.name      # Already normalized, as it is built from entry names only
+            # DirEntry type checks rely on the file type cached by readdir, no stat needed
+            if entry.is_dir():
+                if entry.is_symlink():      # Symlinked directories are not followed, like os.walk does
+                    continue
+                rel += os.sep
+                if is_ignored is not None and is_ignored(rel):
+                    continue                # Ignored directory (like node_modules/), never descended into, so its files cannot be re-included
+                stack.append((entry.path, rel))
+            else:
+                name, dot, ext = entry.name.rpartition('.')
+                ext = dot + ext if name.lstrip('.') else ''     # Leading dots do not start an extension, like in os.path.splitext
+                if extensions and ext not in extensions:
+                    continue
+                if is_ignored is not None and is_ignored(rel):
+                    continue
+                result[rel] = ext
     return result
 
-def parse_gitignore(path: str) -> set[str]:
+_POSIX_CLASSES = {          # Like '[[:digit:]]'
+    'alnum': 'a-zA-Z0-9',
+    'alpha': 'a-zA-Z',
+    'blank': ' \\t',
+    'cntrl': '\\x00-\\x1f\\x7f',
+    'digit': '0-9',
+    'graph': '!-~',
+    'lower': 'a-z',
+    'print': ' -~',
+    'punct': ''.join(re.escape(c) for c in string.punctuation),
+    'space': ' \\t\\n\\r\\f\\v',
+    'upper': 'A-Z',
+    'xdigit': '0-9A-Fa-f',
+}
+
+def _gitignore_class_to_regex(component: str, start: int) -> tuple[str, int] | None:
+    # Translates the class opened by the '[' at start, returning its regex and the index of the closing ']'.
+    # Every char is escaped, so that the regex engine never sees nested sets or unbalanced escapes
+    regex = ''
+    i = start + 1
+    if component[i:i + 1] in ('!', '^'):
+        regex += '^'
+        i += 1
+    first = i
+    known = True            # Turns False on a name like '[[:foo:]]', that makes git never match the class
+    while i < len(component):
+        c = component[i]
+        if c == ']' and i > first:          # A ']' right after '[' (or '[!') is part of the class
+            # Like in git, a class never matches the separator, also when negated ('[!x]') or spanning it ('[+-0]')
+            return (f'(?!{re.escape(os.sep)})[' + regex + ']' if known else '(?!)'), i
+        if c == '[' and component.startswith(':', i + 1):
+            closing = component.find(':]', i + 2)
+            if closing != -1:
+                name = component[i + 2:closing]
+                if name not in _POSIX_CLASSES:
+                    known = False
+                regex += _POSIX_CLASSES.get(name, '')
+                i = closing + 2
+                continue
+        if c == '\\' and i + 1 < len(component):
+            i += 1
+            c = component[i]
+        if component.startswith('-', i + 1) and i + 2 < len(component) and component[i + 2] != ']':
+            i += 2
+            end = component[i]
+            if end == '\\' and i + 1 < len(component):
+                i += 1
+                end = component[i]
+            # Like '[z-a]', git only matches the first char of a reversed range
+            regex += re.escape(c) + '-' + re.escape(end) if c <= end else re.escape(c)
+        else:
+            regex += re.escape(c)
+        i += 1
+    return None
+
+def _gitignore_component_to_regex(component: str) -> str:
+    not_sep = f'[^{re.escape(os.sep)}]'
+    regex = ''
+    i = 0
+    while i < len(component):
+        c = component[i]
+        if c == '*':
+            regex += not_sep + '*'
+        elif c == '?':
+            regex += not_sep
+        elif c == '[':
+            char_class = _gitignore_class_to_regex(component, i)
+            if char_class is None:                      # Never closed, like '[abc', git never matches it
+                regex += '(?!)'
+            else:
+                char_class, i = char_class
+                regex += char_class
+        elif c == '\\' and i + 1 < len(component):     # Escaped char, like '\#' or '\!'
+            i += 1
+            regex += re.escape(component[i])
+        else:
+            regex += re.escape(c)
+        i += 1
+    return regex
+
+def _gitignore_pattern_to_regex(pattern: str) -> str | None:
+    sep = re.escape(os.sep)
+
+    dir_only = pattern.endswith('/')            # Like 'build/', matches directories only
+    pattern = pattern[:-1] if dir_only else pattern     # Only one slash, like git: 'c//' is left as the anchored 'c/'
+    anchored = '/' in pattern                   # Like '/build' or 'src/*.o', relative to the .gitignore directory
+    pattern = pattern[1:] if pattern.startswith('/') else pattern     # Also only one slash, '//c' matches nothing
+    if not pattern:
+        return None
+
+    regex = '' if anchored else f'(?:.*{sep})?'
+    components = pattern.split('/')
+    for i, component in enumerate(components):
+        is_last = i == len(components) - 1
+        if len(component) > 1 and not component.strip('*'):         # Like '**', or '***' that git reads the same way
+            regex += '.+' if is_last else f'(?:.*{sep})?'      # Everything inside / zero or more directories
+        else:
+            if '*' in component:
+                regex += f'(?=[^{sep}])'        # Like 'src/*', never matches the empty name of the 'src/' directory itself
+            regex += _gitignore_component_to_regex(component)
+            if not is_last:
+                regex += sep
+
+    # Directories are matched with a trailing separator. Nothing is added for what sits below a matched directory:
+    # the walk never descends into ignored directories, and files below a re-included one ('!dir/') are judged
+    # by their own patterns, like git does
+    regex += sep if dir_only else f'(?:{sep})?'
+    return regex
+
+def parse_gitignore(path: str) -> Callable[[str], bool]:
     gitignore = Path(path)
-    base_dir = gitignore.parent
 
     with gitignore.open("r", encoding="utf-8") as f:
         patterns = [
@@ -38,21 +179,112 @@ def parse_gitignore(path: str) -> set[str]:
             if line.strip() and not line.strip().startswith("#")
         ]
 
-    gitignore_files = set()
-
+    # Translate patterns into regexes, to be matched against relative paths (directories with a trailing separator)
+    # instead of walking the filesystem once per pattern. Consecutive patterns with the same polarity are combined
+    # into a single regex: without '!' patterns, this is just one regex for the whole file
+    groups = []         # Will contain lists like [negated, [regex, ...]], in .gitignore order
     for pattern in patterns:
-        if pattern.endswith('/'):
-            pattern += '**'
+        negated = pattern.startswith('!')       # Like '!keep.log', re-includes what previous patterns excluded
+        regex = _gitignore_pattern_to_regex(pattern[1:] if negated else pattern)
+        if regex is None:
+            continue
+        try:
+            re.compile(regex)
+        except re.error:
+            continue            # A single bad pattern is skipped, instead of failing the whole .gitignore
+        if groups and groups[-1][0] == negated:
+            groups[-1][1].append(regex)
+        else:
+            groups.append([negated, [regex]])
+
+    compiled_groups = [
+        (negated, re.compile('|'.join(f'(?:{regex})' for regex in regexes), re.DOTALL).fullmatch)
+        for negated, regexes in reversed(groups)
+    ]
+
+    if not compiled_groups or (len(compiled_groups) == 1 and compiled_groups[0][0]):
+        return lambda rel_path: False       # Nothing to ignore, '!' patterns alone only re-include
+    if len(compiled_groups) == 1:
+        return compiled_groups[0][1]
+
+    def is_ignored(rel_path: str) -> bool:
+        for negated, fullmatch in compiled_groups:      # The last matching pattern wins
+            if fullmatch(rel_path):
+                return not negated
+        return False
+
+    return is_ignored
+
+@lru_cache(maxsize=1)
+def load_comment_data() -> dict:
+    # comments.json never changes at runtime: parse it once per process, also when main() is called repeatedly
+    comments_json = Path(__file__).with_name('comments.json')
+    with open(comments_json, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+_worker_loc_counters = {}       # Per-extension LOC counters, built once in each process pool worker
+_MAX_POOL_WORKERS = 61          # ProcessPoolExecutor refuses more workers than this on Windows
+_MIN_POOL_JOBS = 64             # Below this many files, the pool startup costs more than it saves
+
+def _init_worker(ext_table: dict) -> None:
+    # Ship the extension table once per worker instead of pickling comment marks along with every file,
+    # and turn it into ready-to-use counters so that files only cost a dict lookup
+    global _worker_loc_counters
+    _worker_loc_counters = {
+        ext: make_loc_counter(single_line_comment, multi_line_comment)
+        for ext, (single_line_comment, multi_line_comment, _) in ext_table.items()
+    }
 
-        full_pattern = str(base_dir / pattern)
+def _count_one(job: tuple) -> tuple[int | None, str | None]:
+    # Worker for the process pool, must stay at module scope to be picklable
+    abs_path, file_ext = job
+    return count_locs(abs_path, _worker_loc_counters[file_ext])
+
+def process_files(
+        jobs: list[tuple[str, str]], 
+        ext_table: dict, 
+        show_insights: bool
+    ) -> tuple[int, dict, dict]:
+    total_locs = 0
+    errors = []         # Printed in one go to stderr once counting is done, away from the summary on stdout
+    locs_per_ext_hmap = defaultdict(int)
+    longest_file_per_ext_hmap = defaultdict(lambda: (None, -1))   # Will contain, for each extension, tuples like (filepath, #locs)
+
+    # Files are independent: count them in parallel, sending them to the workers in chunks to amortize IPC costs.
+    # Few files are counted in this process instead, as starting the pool would take longer than counting them
+    workers = min(os.cpu_count() or 1, _MAX_POOL_WORKERS)
+    executor = None
+    if workers > 1 and len(jobs) >= _MIN_POOL_JOBS:
+        chunksize = max(1, len(jobs) // (workers * 4))
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(ext_table,))
+        results = executor.map(_count_one, jobs, chunksize=chunksize)
+    else:
+        _init_worker(ext_table)
+        results = map(_count_one, jobs)
+
+    try:
+        for (abs_path, file_ext), (res, error) in zip(jobs, results):
+            if error is not None:
+                errors.append(error)
+            if not res:
+                continue
+            file_locs = res                        # Currently analyzed file LOCs
+            total_locs += file_locs                # Aggregated LOCs across all considered files
+
+            if show_insights:
+                # LOCs
+                stripped_file_ext = ext_table[file_ext][2]
+                locs_per_ext_hmap[stripped_file_ext] += file_locs
+                if longest_file_per_ext_hmap[stripped_file_ext][1] < file_locs:  # Found new longest file of this type, update
+                    longest_file_per_ext_hmap[stripped_file_ext] = (abs_path, file_locs)
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
-        for match in glob.glob(full_pattern, recursive=True):
-            p = Path(match)
-            if p.is_file():
-                relative_path = os.path.normpath(str(p.relative_to(base_dir)))
-                gitignore_files.add(relative_path)
+    if errors:
+        print('\n'.join(errors), file=sys.stderr)
 
-    return gitignore_files
+    return total_locs, locs_per_ext_hmap, longest_file_per_ext_hmap
 
 def loc_info_format_print(
         show_insights: bool, 
@@ -86,84 +318,54 @@ def main():
     show_insights = args.insights
 
     if not project_path.exists():
-        print(f"[PYLOC] Error: path '{project_path}' does not exist")
+        print(f"[PYLOC] Error: path '{project_path}' does not exist", file=sys.stderr)
         return
         
     if not extensions and show_insights:
-        print(f'[PYLOC] Usage: -i/--insights is available only when specifying -e/--extensions')
+        print(f'[PYLOC] Usage: -i/--insights is available only when specifying -e/--extensions', file=sys.stderr)
         return
 
     start_time = time.time()
 
-    target_files = get_files_list(project_path)
-    target_files = set(os.path.normpath(p) for p in target_files)
-
-    excluded_files = set()
+    is_gitignored = None
     if use_gitignore:
         gitignore_path = Path(os.path.join(project_path, '.gitignore'))
         if not gitignore_path.is_file():
-            print(f'[PYLOC] Error: -g/--use_gitignore was specified, but no .gitignore file is present in {project_path}')
+            print(f'[PYLOC] Error: -g/--use_gitignore was specified, but no .gitignore file is present in {project_path}', file=sys.stderr)
             return
         try:
-            excluded_files = parse_gitignore(gitignore_path)
+            is_gitignored = parse_gitignore(gitignore_path)
         except Exception as e:
-            print(f"[PYLOC] Error parsing .gitignore: {e}")
+            print(f"[PYLOC] Error parsing .gitignore: {e}", file=sys.stderr)
             return
 
-    # Filter by extension if provided
-    if extensions:
-        extensions = [ext.lstrip('.') for ext in extensions]
-        target_files = {f for f in target_files if os.path.splitext(f)[1].lstrip('.') in extensions}
+    # Like {'.py', '.java'}, or None to keep every extension ('-e' not given)
+    extensions = {'.' + ext.lstrip('.') for ext in extensions} if extensions else None
 
-    # Exclude .gitignored files
-    target_files.difference_update(excluded_files)
+    target_files = get_files_list(project_path, is_gitignored, extensions)
 
     # Load prog lang commenting info
-    comments_json = Path(__file__).parent / 'comments.json'
-    with open(comments_json, 'r', encoding='utf-8') as f:
-        comment_data = json.load(f)
-
-    locs_per_ext_hmap = {}
-    longest_file_per_ext_hmap = {}   # Will contain, for each extension, tuples like (filepath, #locs)
-
-    total_locs = 0
-    total_time = 0
-    for f in target_files:
-        abs_path = os.path.join(project_path, f)
+    comment_data = load_comment_data()
 
-        file_ext = os.path.splitext(f)[1]      # Get file extension
+    # Precompute, for each known extension, how comments are done in it, so that each file costs a single lookup
+    ext_table = {
+        ext: (
+            comment_syntax.get('single_line', None),    # list or single str
+            comment_syntax.get('multi_line', None),     # dict
+            ext.lstrip('.')
+        )
+        for ext, comment_syntax in comment_data.items()
+    }
 
-        file_comment_syntax = comment_data.get(file_ext)    # Get how comments are done in file based on its extension
-        if file_comment_syntax is None:
+    base_prefix = os.path.join(project_path, '')       # Like 'my_project/', joined to relative paths by plain concatenation
+    jobs = []       # Will contain, for each supported file, tuples like (abs_path, ext)
+    for f, file_ext in sorted(target_files.items()):        # Sorted paths keep files of the same directory together, helping readahead
+        if file_ext not in ext_table:
             continue
 
-        file_single_line_comment = file_comment_syntax.get('single_line', None)    # list or single str
-        file_multi_line_comment = file_comment_syntax.get('multi_line', None)     # dict
+        jobs.append((base_prefix + f, file_ext))
 
-        res = count_locs(abs_path, file_single_line_comment, file_multi_line_comment)
-        if not res:
-            continue
-        file_locs = res                        # Currently analyzed file LOCs
-        total_locs += file_locs                # Aggregated LOCs across all considered files
-        
-        if show_insights:
-            # LOCs
-            stripped_file_ext = file_ext.lstrip('.')
-            if extensions:
-                if locs_per_ext_hmap.get(stripped_file_ext):
-                    locs_per_ext_hmap[stripped_file_ext] += file_locs
-                else:
-                    locs_per_ext_hmap[stripped_file_ext] = file_locs
-                if longest_file_per_ext_hmap.get(stripped_file_ext):
-                    if longest_file_per_ext_hmap[stripped_file_ext][1] < file_locs:  # Found new longest file of this type, update
-                        longest_file_per_ext_hmap[stripped_file_ext] = (abs_path, file_locs)
-                else:
-                    longest_file_per_ext_hmap[stripped_file_ext] = (abs_path, file_locs)
-            else:
-                if locs_per_ext_hmap.get(stripped_file_ext):
-                    locs_per_ext_hmap[stripped_file_ext] += file_locs
-                else:
-                    locs_per_ext_hmap[stripped_file_ext] = file_locs
+    total_locs, locs_per_ext_hmap, longest_file_per_ext_hmap = process_files(jobs, ext_table, show_insights)
 
     total_time = time.time() - start_time
     loc_info_format_print(
@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+
+from pyloc.main import get_files_list, parse_gitignore
+
+
+FILES = [
+    'a.log', 'a.py', 'keep.py', 't1.py', 'z.py', 'A.py', '5.py', '-.py', '[.py', '].py',
+    'a/b', 'a/c/d', 'c/e', 'x/y.c',
+    'build/out.o', 'build/x.c',
+    'deep/x.txt', 'deep/a/b/c.txt',
+    'docs/d.md', 'docs/keep/k.py', 'docs/keep/sub/s.txt',
+    'lib/build/m.py',
+    'logs/a.log', 'logs/b.py',
+    'src/b.py', 'src/x.js', 'src/a/y.js', 'src/a/z.py',
+    'sub/keep.py',
+]
+
+# .gitignore contents, and the files that 'git ls-files -o --exclude-standard' leaves out for them
+CASES = [
+    # Negation
+    (['*.log', '!logs/'], ['a.log', 'logs/a.log']),
+    (['*.js', '!src/'], ['src/a/y.js', 'src/x.js']),
+    (['src/**', '!src/a/'], ['src/a/y.js', 'src/a/z.py', 'src/b.py', 'src/x.js']),
+    (['docs/**', '!docs/keep/'], ['docs/d.md', 'docs/keep/k.py', 'docs/keep/sub/s.txt']),
+    (['*', '!*/', '!*.py'], ['a.log', 'a/b', 'a/c/d', 'build/out.o', 'build/x.c', 'c/e', 'deep/a/b/c.txt', 'deep/x.txt',
+                             'docs/d.md', 'docs/keep/sub/s.txt', 'logs/a.log', 'src/a/y.js', 'src/x.js', 'x/y.c']),
+    (['build', '!build/x.c'], ['build/out.o', 'build/x.c', 'lib/build/m.py']),      # Files of an ignored directory cannot be re-included
+    (['docs/', '!docs/keep/'], ['docs/d.md', 'docs/keep/k.py', 'docs/keep/sub/s.txt']),
+    (['a.*', '!a.py'], ['a.log', 'logs/a.log']),
+    (['*.py', '!src/'], ['-.py', '5.py', 'A.py', '[.py', '].py', 'a.py', 'docs/keep/k.py', 'keep.py', 'lib/build/m.py',
+                         'logs/b.py', 'src/a/z.py', 'src/b.py', 'sub/keep.py', 't1.py', 'z.py']),
+    # Single group
+    (['!keep.py'], []),
+    (['t[0-9].py'], ['t1.py']),
+    # Directories only
+    (['build/'], ['build/out.o', 'build/x.c', 'lib/build/m.py']),
+    (['src/*/'], ['src/a/y.js', 'src/a/z.py']),
+    # Anchored
+    (['/build'], ['build/out.o', 'build/x.c']),
+    (['src/*'], ['src/a/y.js', 'src/a/z.py', 'src/b.py', 'src/x.js']),
+    (['**/keep.py', '!/keep.py'], ['sub/keep.py']),
+    # '**'
+    (['deep/**'], ['deep/a/b/c.txt', 'deep/x.txt']),
+    (['deep/**/c.txt'], ['deep/a/b/c.txt']),
+    # Character classes
+    (['[z-a].py'], ['src/a/z.py', 'z.py']),
+    (['[[:alpha:]].py'], ['A.py', 'a.py', 'docs/keep/k.py', 'lib/build/m.py', 'logs/b.py', 'src/a/z.py', 'src/b.py', 'z.py']),
+    (['[![:alpha:]].py'], ['-.py', '5.py', '[.py', '].py']),
+    (['[[:foo:]].py'], []),
+    (['[]a-].py'], ['-.py', '].py', 'a.py']),
+    (['[a\\-z].py'], ['-.py', 'a.py', 'src/a/z.py', 'z.py']),
+    (['[.py'], []),
+    # Classes never match the separator
+    (['src[!_]'], []),
+    (['a[!x]b'], []),
+    (['x[!.]y.c'], []),
+    (['a[[:punct:]]b'], []),
+    (['a[+-0]b'], []),
+    # Only one leading and one trailing slash are special
+    (['c//'], []),
+    (['/c//'], []),
+    (['//c'], []),
+    (['***/b'], ['a/b', 'deep/a/b/c.txt']),
+]
+
+
+class TestGitignore(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        for f in FILES:
+            path = os.path.join(self.root, *f.split('/'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, 'w').close()
+
+    def ignored_files(self, patterns: list[str]) -> list[str]:
+        gitignore = os.path.join(self.root, '.gitignore')
+        with open(gitignore, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(patterns) + '\n')
+        kept = get_files_list(self.root, parse_gitignore(gitignore))
+        return sorted(f for f in FILES if os.path.join(*f.split('/')) not in kept)
+
+    def test_cases(self):
+        for patterns, expected in CASES:
+            with self.subTest(patterns=patterns):
+                self.assertEqual(self.ignored_files(patterns), sorted(expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
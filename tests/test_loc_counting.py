@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from pyloc.loc_counting import loc_counting
+from pyloc.loc_counting.loc_counting import count_locs, make_loc_counter
+
+
+C = ('//', {'start': '/*', 'end': '*/'})
+PY = ('#', {'start': "'''", 'end': "'''"})
+HTML = (None, {'start': '<!--', 'end': '-->'})
+SH = ('#', None)
+
+# Comment syntax, file contents and expected LOCs
+CASES = [
+    # Code sharing a line with a block
+    (C, b'int a; /* c */ int b;\n', 1),
+    (C, b'/* c */ int a;\n', 1),
+    (C, b'int a; /* c */\n', 1),
+    (HTML, b'<p>a</p><!-- c -->\n<!--\nx\n-->\n<p>b</p>\n', 2),
+    # One-line and multi-line blocks
+    (C, b'/* one */\nint a;\nint b;\n', 2),
+    (C, b'/* a\n b\n */\nint a;\n', 1),
+    (C, b'/* a */ /* b */\n/* c */int a;/* d\n*/\n', 1),
+    # Start mark inside a single line comment
+    (C, b'// see /* here\nint a;\n/* c */\n', 1),
+    (PY, b"# no ''' block\nx = 1\n'''\ndoc\n'''\n", 1),
+    # Unterminated block, left as code
+    (C, b'int a;\n/* open\nint b;\n', 3),
+    (PY, b"x = 1\ny = '''\nz\n", 3),
+    # Same start and end mark
+    (PY, b"'''doc'''\nx = 1\n", 1),
+    (PY, b"'''\ndoc\n'''\nx = 1\n# c\n", 1),
+    (PY, b"'''a'''\n'''b'''\nx = 1\n", 1),
+    # CRLF line endings
+    (C, b'int a;\r\n\r\n/* c\r\n */\r\n// x\r\nint b;\r\n', 2),
+    (PY, b"'''\r\ndoc\r\n'''\r\nx = 1\r\n", 1),
+    # No block comments, blank lines and full line comments only
+    (SH, b'#!/bin/sh\necho a\n\n  # c\n\techo b', 2),
+    (SH, b'', 0),
+]
+
+
+class TestLocCounting(unittest.TestCase):
+
+    def test_cases(self):
+        for (comment_signs, multi_line_comment_signs), data, expected in CASES:
+            with self.subTest(data=data):
+                counter = make_loc_counter(comment_signs, multi_line_comment_signs)
+                self.assertEqual(counter(data), expected)
+
+    def test_windows(self):
+        # Files bigger than a window are counted window by window, which must not change the result
+        counter = make_loc_counter(*C)
+        data = b'int a; /* c */\n\n/* a\n b */\n  // x\nint b;\n' * (loc_counting._WINDOW_SIZE // 20)
+        self.assertGreater(len(data), loc_counting._WINDOW_SIZE)
+        with mock.patch.object(loc_counting, '_WINDOW_SIZE', len(data)):
+            whole = counter(data)
+        self.assertEqual(whole, 2 * (loc_counting._WINDOW_SIZE // 20))
+        self.assertEqual(counter(data), whole)
+        with mock.patch.object(loc_counting, '_WINDOW_SIZE', 7):
+            self.assertEqual(counter(data), whole)
+
+    def test_count_locs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'a.c')
+            with open(path, 'wb') as f:
+                f.write(b'int a; /* c */\nint b;\n')
+            counter = make_loc_counter(*C)
+            self.assertEqual(count_locs(path, counter), (2, None))
+            locs, error = count_locs(os.path.join(tmp, 'missing.c'), counter)
+            self.assertIsNone(locs)
+            self.assertIn('missing.c', error)
+
+
+if __name__ == '__main__':
+    unittest.main()